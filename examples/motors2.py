@@ -5,6 +5,28 @@ from tripipy import tmc5130regs
 import sys
 
 
+class batchedUpdates():
+    """
+    context manager that collects widget text updates so a tick's worth of changes hits Tk together at the end.
+
+    Re-entrant - only the outermost exit flushes the pending writes.
+    """
+    nesting=0
+    pending=[]
+
+    def __enter__(self):
+        batchedUpdates.nesting += 1
+        return self
+
+    def __exit__(self, etype, evalue, etrace):
+        batchedUpdates.nesting -= 1
+        if batchedUpdates.nesting==0 and batchedUpdates.pending:
+            flushing=batchedUpdates.pending
+            batchedUpdates.pending=[]
+            for widget, s in flushing:
+                widget.value=s
+        return False
+
 class Ftext(gz.Text):
     """
     simple extension to Text that links it to a given motor
@@ -16,6 +38,7 @@ class Ftext(gz.Text):
         self.mpanel=mpanel
         ftxt=self.makeString()
         super().__init__(master=mpanel.panel, text=ftxt, **kwargs)
+        self.lastshown=ftxt
 
     def makeString(self):
         """
@@ -23,27 +46,44 @@ class Ftext(gz.Text):
         """
         raise NotImplementedError
 
+    def showString(self, s):
+        """
+        pushes the string to the widget, but only if it changed - each update is a heavy round trip through Tk
+        """
+        if s != self.lastshown:
+            self.lastshown=s
+            if batchedUpdates.nesting:
+                batchedUpdates.pending.append((self, s))
+            else:
+                self.value=s
+
 class FmotorName(Ftext):
     def makeString(self):
         return self.mpanel.motor.name
 
 class Ffield(Ftext):
-    def __init__(self, motorfield, format='{}', **kwargs):
+    def __init__(self, mpanel, motorfield, format='{}', **kwargs):
         """
         the displayed value is linked to a motor field and formatted
         """
         self.motorfield=motorfield
         self.format=format
-        super().__init__(**kwargs)
+        self.formatter=format.format            # bind the format method once - saves an attribute lookup per tick
+        self.regobj=mpanel.motor[motorfield]    # resolve the slash-separated path to the motor field object just once
+        self.lastval=None
+        super().__init__(mpanel=mpanel, **kwargs)
 
     def getValue(self):
-        return self.mpanel.motor[self.motorfield].getCurrent()
+        return self.regobj.getCurrent()
 
     def makeString(self):
-        return self.format.format(self.getValue())
+        return self.formatter(self.getValue())
 
     def update(self):
-        self.value=self.makeString()
+        v=self.getValue()
+        if v != self.lastval:       # skip the format and the Tk write when the underlying value is unchanged
+            self.lastval=v
+            self.showString(self.makeString())
 
 class TimeField(Ffield):
     """
@@ -55,24 +95,30 @@ class TimeField(Ffield):
         secs = round((v % 1) * 60)
         mins = mint % 60
         hours= int(mins / 60)
-        return self.format.format(hours=hours, mins=mins, secs=secs)
+        return self.formatter(hours=hours, mins=mins, secs=secs)
 
 class BitField(Ftext):
     """
     The displayed value is a single bitFlag
     """
-    def __init__(self, motorfield, flagbit, textOn='Y', textOff='', **kwargs):
+    def __init__(self, mpanel, motorfield, flagbit, textOn='Y', textOff='', **kwargs):
         self.motorfield=motorfield
         self.flagbit=flagbit
+        self.flagmask=int(flagbit)              # plain int mask - a direct AND beats testFlag's method dispatch per tick
         self.textOn=textOn
         self.textOff=textOff
-        super().__init__(**kwargs)
+        self.regobj=mpanel.motor[motorfield]    # resolve the register object once - the bit is checked every tick
+        self.lastflag=None
+        super().__init__(mpanel=mpanel, **kwargs)
 
     def makeString(self):
-        return self.textOn if self.mpanel.motor[self.motorfield].testFlag(self.flagbit) else self.textOff
+        return self.textOn if self.regobj.curval & self.flagmask else self.textOff
 
     def update(self):
-        self.value=self.makeString()
+        flagset=bool(self.regobj.curval & self.flagmask)
+        if flagset != self.lastflag:    # only rebuild the string / touch Tk when the bit has flipped
+            self.lastflag=flagset
+            self.showString(self.textOn if flagset else self.textOff)
 
 class CalcField(Ffield):
     """
@@ -88,6 +134,14 @@ class CalcField(Ffield):
     def getValue(self):
         return self.converter(super().getValue())
 
+class mpanelMethod(str):
+    """
+    marks a command name as naming a method of the owning motorPanel rather than of the widget itself.
+
+    The '../' prefixed strings in the field definitions are converted to this once when the specs are built.
+    """
+    pass
+
 class CheckBox(gz.CheckBox):
     """
     checkbox...
@@ -95,8 +149,8 @@ class CheckBox(gz.CheckBox):
     def __init__(self, mpanel, command=None, **kwargs):
         if command is None:
             cmd=None
-        elif command.startswith('../'):
-            cmd=getattr(mpanel, command[3:])
+        elif isinstance(command, mpanelMethod):
+            cmd=getattr(mpanel, command)
         else:
             cmd=getattr(self, command)
         assert cmd is None or callable(cmd)
@@ -123,20 +177,37 @@ class EdText(gz.TextBox):
 #    def __init__(self, minval, maxval, **kwargs):
 #        pass
 
+class keepChars(dict):
+    """
+    translate table for str.translate that keeps the characters given to the constructor and deletes everything else
+    """
+    def __init__(self, keep):
+        super().__init__((ord(c), c) for c in keep)
+
+    def __missing__(self, key):
+        return None
+
 class EdFloat(EdText):
     """
     EdText specialised for floating point numbers
     """
+    floatchars=keepChars('+-.0123456789')
+
     def __init__(self, minval, maxval, **kwargs):
         self.minval=-sys.float_info.max if minval is None else float(minval)
         self.maxval=sys.float_info.max if maxval is None else float(maxval)
         super().__init__(**kwargs)
 
     def checker(self):
-        for ix, ch in enumerate(self.value):
-            if not ch in '+-.0123456789':
-                xval=self.value[:ix]+self.value[ix+1:]
-                self.value=xval
+        """
+        called when the user edits the field - strips invalid characters in a single pass.
+
+        Only writes the value back if it changed (the write re-triggers checker, but the cleaned value passes straight through).
+        """
+        v=self.value
+        cleaned=v.translate(self.floatchars)
+        if cleaned != v:
+            self.value=cleaned
 
     def getValue(self):
         try:
@@ -157,8 +228,8 @@ class EdChoice(gz.Combo):
 class Button(gz.PushButton):
     def __init__(self, mpanel, command, **kwargs):
         self.mpanel=mpanel
-        if command.startswith('../'):
-            cmd=getattr(mpanel, command[3:])
+        if isinstance(command, mpanelMethod):
+            cmd=getattr(mpanel, command)
         else:
             cmd=getattr(self, command)
         assert callable(cmd)
@@ -166,120 +237,164 @@ class Button(gz.PushButton):
 
 
 
+class fieldSpec():
+    """
+    one row of the motor display - the label column widget and the per-motor value widget.
+
+    The specs are built once at import time and shared between the label build and each motorPanel.
+    """
+    __slots__=('y', 'name', 'labelclass', 'labelkw', 'cellclass', 'cellkw')
+
+    def __init__(self, y, name, labelclass, labelkw, cellclass, cellkw):
+        """
+        y           : grid row for this field
+
+        name        : name of the field - used by the motor panel to identify each field
+
+        labelclass  : class used for the label for the row (1 column per motor)
+
+        labelkw     : keyword args for the label cell, the grid position is added when the constructor is called
+
+        cellclass   : class used for the cell displaying this motor's value for the field (None for no value cell)
+
+        cellkw      : keyword args for the value cell
+        """
+        self.y=y
+        self.name=name
+        self.labelclass=labelclass
+        self.labelkw=labelkw
+        self.cellclass=cellclass
+        cmd=cellkw.get('command')
+        if isinstance(cmd, str) and cmd.startswith('../'):
+            # resolve the '../' indirection once here rather than in every widget constructor
+            cellkw=dict(cellkw, command=mpanelMethod(cmd[3:]))
+        self.cellkw=cellkw
+
+motorfields=tuple(fieldSpec(y, *fdef) for y, fdef in enumerate((
+    ('motor',    gz.Text, {'text': 'motor:',     'align': 'right'}, FmotorName,  {}),
+    ('runtype',  gz.Text, {'text': 'run type:',  'align': 'right'}, EdChoice,    {'options': ['goto target', 'run forward', 'run reverse']}),
+    ('speed',    gz.Text, {'text': 'speed:',     'align': 'right'}, EdChoice,    {'options': ['max rpm', 'real time', 'double speed', 'sidereal time', 'target']}),
+    ('userpm',   gz.Text, {'text': 'target rpm:','align': 'right'}, EdFloat,     {'minval': -100000, 'maxval': 1000000, 'align': 'left'}),
+    ('targetpos',gz.Text, {'text': 'target posn:','align': 'right'}, EdFloat,    {'minval':None, 'maxval': None, 'align': 'left'}),
+    ('action',   gz.Text, {'text': 'do it NOW!', 'align': 'right'}, Button,      {'text': 'ACTION!', 'command': '../actionButton'}),
+    ('reversed', gz.Text, {'text': 'swap direction:','align':'right'},CheckBox,  {'command': '../flipdir'}),
+    ('stat_atpos',gz.Text,{'text': 'at posn'},                      BitField,    {'motorfield': 'chipregs/SHORTSTAT', 'flagbit': tmc5130regs.statusFlags.at_position,}),
+    ('stat_atmax',gz.Text,{'text': 'at max rpm'},                   BitField,    {'motorfield': 'chipregs/SHORTSTAT', 'flagbit': tmc5130regs.statusFlags.at_VMAX,}),
+    ('posn',     gz.Text, {'text': 'time:',      'align': 'right'}, TimeField,   {'motorfield':'settings/posn', 'format': '{hours:02d}:{mins:02d}:{secs:02d}', 'align':'left'}),
+    ('XACTUAL',  gz.Text, {'text': 'XACTUAL:',   'align': 'right'}, Ffield,      {'motorfield': 'chipregs/XACTUAL', 'format': '{:7d}', 'align': 'left'}),
+    ('XTARGET',  gz.Text, {'text': 'XTARGET:',   'align': 'right'}, Ffield,      {'motorfield': 'chipregs/XTARGET', 'format': '{:7d}', 'align': 'left'}),
+    ('currpm',   gz.Text, {'text': 'current rpm:','align':'right'}, Ffield,      {'motorfield': 'settings/rpmnow', 'format': '{:5.2f}', 'align': 'left'}),
+    ('VACTUAL',  gz.Text, {'text': 'VACTUAL',    'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VACTUAL', 'format': '{:7d}', 'align': 'left'}),
+    ('loadtemp', gz.Text, {'text': 'load / temp:','align':'right'}, Ffield,      {'motorfield': 'chipregs/DRVSTATUS/SG_RESULT', 'format': '{:5d}', 'align':'left'}),
+    ('maxrpm',   gz.Text, {'text': 'max rpm:',   'align': 'right'}, Ffield,      {'motorfield': 'settings/maxrpm', 'format': '{:5.2f}'}),
+    ('startrpm', gz.Text, {'text': 'start rpm:', 'align': 'right'}, CalcField,   {'motorfield': 'chipregs/VSTART', 'format': '{:5.2f}'}),
+    ('VMAX',     gz.Text, {'text': 'VMAX:',      'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VMAX', 'format': '{:d}'}),
+    ('VSTART',   gz.Text, {'text': 'VSTART:',    'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VSTART', 'format': '{:d}'}),
+    ('v1rpm',    gz.Text, {'text': 'V1 rpm:',    'align': 'right'}, CalcField,   {'motorfield': 'chipregs/V1', 'format': '{:5.2f}'}),
+    ('stoprpm',  gz.Text, {'text': 'stop rpm:',  'align': 'right'}, CalcField,   {'motorfield': 'chipregs/VSTOP', 'format': '{:5.2f}'}),
+    ('VSTOP',    gz.Text, {'text': 'VSTOP:',     'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VSTOP', 'format': '{:d}'})
+)))
+
+
 class motorPanel():
-    def __init__(self, motor, gridx, pfields, panel):
+    tickregs=('VACTUAL', 'XACTUAL', 'XTARGET', 'GSTAT', 'DRVSTATUS')    # registers fetched on every tick - no aliases / repeats
+
+    def __init__(self, motor, gridx, panel):
         self.motor=motor
         self.panel=panel
         self.mfields={}
-        for k,v in pfields.items():
-            if not v['class'] is None:
-                self.mfields[k]=v['class'](mpanel=self, grid=[gridx,v['y']], **v['kwargs'])
+        for f in motorfields:
+            if not f.cellclass is None:
+                self.mfields[f.name]=f.cellclass(mpanel=self, grid=[gridx,f.y], **f.cellkw)
+        self.speedactions={     # dispatch table for the speed choice - each entry returns the rpm to use
+            'max rpm'       : self.mfields['maxrpm'].getValue,
+            'real time'     : lambda: 1,
+            'double speed'  : lambda: 2,
+            'sidereal time' : lambda: 86164.1/86400,
+            'target'        : self.mfields['userpm'].getValue,
+        }
+        self.runactions={       # dispatch table for the run type choice
+            'goto target'   : self.runGoto,
+            'run forward'   : self.runForward,
+            'run reverse'   : self.runReverse,
+        }
+        self.gconfreg=motor['chipregs/GCONF']       # resolved once - all later access is a plain attribute load
+        self.tickreads=dict.fromkeys(self.tickregs, 0)
+        self.tickfields=[self.mfields[f] for f in
+                ('XACTUAL', 'posn', 'VACTUAL', 'currpm', 'XTARGET', 'VMAX', 'stat_atpos', 'stat_atmax', 'loadtemp')]
         print('chip version is %d' % self.motor['chipregs/IOIN/VERSION'].getCurrent())
 
     def ticker(self):
-        reads={'VACTUAL':0, 'XACTUAL':0, 'XTARGET':0, 'VACTUAL': 0, 'GSTAT':0, 'DRVSTATUS':0}
-        # first get the driver registers up to date
-        self.motor.readWriteMultiple(reads, 'R')
-        for f in ('XACTUAL', 'posn', 'VACTUAL', 'currpm', 'XTARGET', 'VMAX', 'stat_atpos', 'stat_atmax', 'loadtemp'):
-            self.mfields[f].update()
+        # first get the driver registers up to date in a single SPI transaction, then refresh the linked fields
+        self.motor.readWriteMultiple(self.tickreads, 'R')
+        with batchedUpdates():
+            for f in self.tickfields:
+                f.update()
 
     def close(self):
         self.motor.close()
 
     def flipdir(self):
         dir=self.mfields['reversed'].value==1
-        self.motor['chipregs/GCONF'].setFlag(tmc5130regs.GCONFflags.shaft,dir)
+        self.gconfreg.setFlag(tmc5130regs.GCONFflags.shaft,dir)
         self.motor.writeInt('GCONF')
 
     def actionButton(self):
         rtype=self.mfields['runtype'].value
         rspeed=self.mfields['speed'].value
-        if rspeed=='max rpm':
-            speed=self.mfields['maxrpm'].getValue()
-        elif rspeed=='real time':
-            speed=1
-        elif rspeed=='double speed':
-            speed=2
-        elif rspeed=='sidereal time':
-            speed=86164.1/86400
-        elif rspeed=='target':
-            speed=self.mfields['userpm'].getValue()      
-        else:
+        if not rspeed in self.speedactions:
             raise ValueError("speed oops " + rspeed)
-        if rtype=='goto target':
-            posn=self.mfields['targetpos'].getValue()
-            print('doit', rtype, posn, speed)
-            self.motor.goto(targetpos=posn, speed=speed)
-        elif rtype in ('run forward','run reverse'):
-            self.motor.setspeed(speed=speed if rtype=='run forward' else -speed)
-        else:
+        if not rtype in self.runactions:
             raise ValueError('rtype oops '+ rtype)
+        self.runactions[rtype](self.speedactions[rspeed]())
+
+    def runGoto(self, speed):
+        posn=self.mfields['targetpos'].getValue()
+        print('doit', 'goto target', posn, speed)
+        self.motor.goto(targetpos=posn, speed=speed)
+
+    def runForward(self, speed):
+        self.motor.setspeed(speed=speed)
+
+    def runReverse(self, speed):
+        self.motor.setspeed(speed=-speed)
 
 
 class Example():
     def __init__(self):
 
+        self.app = None
         self.elapsed = None
         self.motorpan = None
         self.starttime = None
-
-        """
-        defines the fields setup for each motor. Each entry a list of 4.
-        The  are used by the app to setup the labels for the fields:
-        0: Name of the field - used by the motor class to identify each field
-
-        The next 2 are used to setup the label for the field
-        1: class used for the label for the row ( 1 column per motor)
-        2: keyword args for the label cell, the grid position is added when the constructor is called
-
-        The last 2 are used by the motor class to setup its values for each field
-        3: class used for cell displaying this motor's value for the field
-        4: keyword args for the value cell.
-        """
-        self.motorfields=(
-            ('motor',    gz.Text, {'text': 'motor:',     'align': 'right'}, FmotorName,  {}),
-            ('runtype',  gz.Text, {'text': 'run type:',  'align': 'right'}, EdChoice,    {'options': ['goto target', 'run forward', 'run reverse']}),
-            ('speed',    gz.Text, {'text': 'speed:',     'align': 'right'}, EdChoice,    {'options': ['max rpm', 'real time', 'double speed', 'sidereal time', 'target']}),
-            ('userpm',   gz.Text, {'text': 'target rpm:','align': 'right'}, EdFloat,     {'minval': -100000, 'maxval': 1000000, 'align': 'left'}),
-            ('targetpos',gz.Text, {'text': 'target posn:','align': 'right'}, EdFloat,    {'minval':None, 'maxval': None, 'align': 'left'}),
-            ('action',   gz.Text, {'text': 'do it NOW!', 'align': 'right'}, Button,      {'text': 'ACTION!', 'command': '../actionButton'}),
-            ('reversed', gz.Text, {'text': 'swap direction:','align':'right'},CheckBox,  {'command': '../flipdir'}),
-            ('stat_atpos',gz.Text,{'text': 'at posn'},                      BitField,    {'motorfield': 'chipregs/SHORTSTAT', 'flagbit': tmc5130regs.statusFlags.at_position,}),
-            ('stat_atmax',gz.Text,{'text': 'at max rpm'},                   BitField,    {'motorfield': 'chipregs/SHORTSTAT', 'flagbit': tmc5130regs.statusFlags.at_VMAX,}),
-            ('posn',     gz.Text, {'text': 'time:',      'align': 'right'}, TimeField,   {'motorfield':'settings/posn', 'format': '{hours:02d}:{mins:02d}:{secs:02d}', 'align':'left'}),
-            ('XACTUAL',  gz.Text, {'text': 'XACTUAL:',   'align': 'right'}, Ffield,      {'motorfield': 'chipregs/XACTUAL', 'format': '{:7d}', 'align': 'left'}),
-            ('XTARGET',  gz.Text, {'text': 'XTARGET:',   'align': 'right'}, Ffield,      {'motorfield': 'chipregs/XTARGET', 'format': '{:7d}', 'align': 'left'}),
-            ('currpm',   gz.Text, {'text': 'current rpm:','align':'right'}, Ffield,      {'motorfield': 'settings/rpmnow', 'format': '{:5.2f}', 'align': 'left'}),
-            ('VACTUAL',  gz.Text, {'text': 'VACTUAL',    'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VACTUAL', 'format': '{:7d}', 'align': 'left'}),
-            ('loadtemp', gz.Text, {'text': 'load / temp:','align':'right'}, Ffield,      {'motorfield': 'chipregs/DRVSTATUS/SG_RESULT', 'format': '{:5d}', 'align':'left'}),
-            ('maxrpm',   gz.Text, {'text': 'max rpm:',   'align': 'right'}, Ffield,      {'motorfield': 'settings/maxrpm', 'format': '{:5.2f}'}),
-            ('startrpm', gz.Text, {'text': 'start rpm:', 'align': 'right'}, CalcField,   {'motorfield': 'chipregs/VSTART', 'format': '{:5.2f}'}),
-            ('VMAX',     gz.Text, {'text': 'VMAX:',      'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VMAX', 'format': '{:d}'}),
-            ('VSTART',   gz.Text, {'text': 'VSTART:',    'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VSTART', 'format': '{:d}'}),
-            ('v1rpm',    gz.Text, {'text': 'V1 rpm:',    'align': 'right'}, CalcField,   {'motorfield': 'chipregs/V1', 'format': '{:5.2f}'}),
-            ('stoprpm',  gz.Text, {'text': 'stop rpm:',  'align': 'right'}, CalcField,   {'motorfield': 'chipregs/VSTOP', 'format': '{:5.2f}'}),
-            ('VSTOP',    gz.Text, {'text': 'VSTOP:',     'align': 'right'}, Ffield,      {'motorfield': 'chipregs/VSTOP', 'format': '{:d}'})
-        )
+        self.lastsecs = None
+        self.skipticks = 0
 
     def ticker(self):
-        el=time.time()-self.starttime
-        elm=int(el/60)
-        els=int(el-elm*60)
-        self.elapsed.value='%2d:%2d' %(elm, els)
+        if self.app.tk.wm_state()=='iconic':
+            # window is minimised - drop to a 10 second poll, no point in SPI traffic nobody can see
+            self.skipticks += 1
+            if self.skipticks < 10:
+                return
+        self.skipticks=0
+        secs=(time.monotonic_ns()-self.starttime)//1000000000     # integer maths only - no FP in the periodic callback
+        if secs != self.lastsecs:   # only touch the Tk label when the displayed time has moved on
+            self.lastsecs=secs
+            elm, els=divmod(secs, 60)
+            self.elapsed.value='%2d:%2d' %(elm, els)
         self.motorpan.ticker()
 
     def run(self):
         app = gz.App(title="Motor testing")
-        self.starttime = time.time()
+        self.app = app
+        self.starttime = time.monotonic_ns()
         header = gz.Box(app, align='top', width='fill')
         self.elapsed = gz.Text(header, text="clock here", align='right')
         mpanel = gz.Box(app, align='left', layout='grid')
 
-        pfields = {}
-        for y, field in enumerate(self.motorfields):
-            l = field[1](mpanel, grid=[0, y], **field[2])
-            pfields[field[0]] = {'y': y, 'class': field[3], 'kwargs': field[4], }
-        self.motorpan = motorPanel(motor=chipdrive.tmc5130(), gridx=1, pfields=pfields, panel=mpanel)  # loglvl='rawspi'
+        for f in motorfields:
+            l = f.labelclass(mpanel, grid=[0, f.y], **f.labelkw)
+        self.motorpan = motorPanel(motor=chipdrive.tmc5130(), gridx=1, panel=mpanel)  # loglvl='rawspi'
         app.repeat(1000, self.ticker)
         app.display()
         print('shutting down')
@@ -17,3 +17,4 @@ from . import tmc5130regs
 from . import tmc5160regs
 from . import treedict
 from . import trinamicDriver
+from . import trinamicRegs
@@ -10,9 +10,9 @@ written from info in the TMC5130 datasheet (https://www.trinamic.com/fileadmin/a
 """
 import logging
 import pigpio
+import threading
 import time
 import sys
-from collections import OrderedDict
 from enum import IntFlag, auto
 
 from tripipy import treedict
@@ -20,6 +20,47 @@ from tripipy import trinamicDriver, tmc5130regs
 
 from tripipy.tmc5130regs import statusFlags as motorStatus
 
+logger=logging.getLogger(__name__)
+
+_sharedpio=None     # one pigpio client (one daemon socket) shared by every motor in the process
+_sharedusers=0
+
+def getPigpio():
+    """
+    returns the process-wide shared pigpio instance, creating / reconnecting it on first use.
+
+    Each motor that borrows the instance must release it through its close() - the socket is shut when the
+    last borrower closes. Callers who want their own connection can still pass pigio= explicitly.
+    """
+    global _sharedpio, _sharedusers
+    if _sharedpio is None or not _sharedpio.connected:
+        # a fresh connection starts its own user count - borrowers of a dead connection release against
+        # that connection (see _dropPigpio), never against this one
+        _sharedpio=pigpio.pi()
+        _sharedusers=0
+    _sharedusers += 1
+    return _sharedpio
+
+def _dropPigpio(pio):
+    """
+    releases one borrow of the instance getPigpio handed out.
+
+    pio: the instance the borrower was given. If the daemon restarted and getPigpio has since built a
+         replacement connection, a stale borrower's release is a no-op - its count died with its connection.
+    """
+    global _sharedpio, _sharedusers
+    if pio is not _sharedpio:
+        return
+    _sharedusers -= 1
+    if _sharedusers <= 0 and not _sharedpio is None:
+        _sharedpio.stop()
+        _sharedpio=None
+
+# hard_stop's SWMODE manipulation masks, composed once - OR-ing IntFlag members builds a new instance each time
+swmodeStopEnables=int(tmc5130regs.SWMODEflags.stop_l_enable | tmc5130regs.SWMODEflags.stop_r_enable)
+swmodeStopPolarity=int(tmc5130regs.SWMODEflags.pol_stop_l | tmc5130regs.SWMODEflags.pol_stop_r)
+swmodeSoftstopOff=~int(tmc5130regs.SWMODEflags.en_softstop)
+
 class regFlags(IntFlag):
     NONE        =0
     uptodate    =auto()
@@ -40,16 +81,17 @@ class appreg(treedict.Tree_dict):
         """
         super().__init__(**kwargs)
         self.chipreg=self[chipreg]
+        self.motor=self['../..']    # resolved once - every access otherwise re-walks the tree
 
 class appregVelocity(appreg):
     """
     for chipregisters representing velocity, using the standard convertion.
     """
     def getCurrent(self):
-        return self['../..'].VREGtoRPM(self.chipreg.getCurrent())
+        return self.motor.VREGtoRPM(self.chipreg.getCurrent())
 
     def setVal(self, value):
-        self.chipreg.setValue(self['../..'].RPMtoVREG(value))
+        self.chipreg.setValue(self.motor.RPMtoVREG(value))
 
 class appregPosn(appreg):
     """
@@ -57,12 +99,13 @@ class appregPosn(appreg):
     """
     def __init__(self, chipreg='../../chipregs/XACTUAL', **kwargs):
         super().__init__(chipreg=chipreg, **kwargs)
+        self.usprnode=self['../uStepsPerRev']
 
     def getCurrent(self):
-        return self.chipreg.getCurrent()/self['../uStepsPerRev'].getCurrent()
+        return self.chipreg.getCurrent()/self.usprnode.getCurrent()
 
     def setVal(self, value):
-        self.chipreg.setValue(round(value*self['../uStepsPerRev'].getCurrent()))
+        self.chipreg.setValue(round(value*self.usprnode.getCurrent()))
 
 class appval(treedict.Tree_dict):
     """
@@ -87,6 +130,10 @@ class uStepsPR(appval):
         super().__init__(**kwargs)
         self.setVal(self['../stepsPerRev'].getCurrent()*self['../uSteps'].getCurrent())
 
+    def setVal(self, value):
+        super().setVal(value)
+        self.app.rpmscale=None      # speed conversions cache a factor derived from this - force a recompute
+
 motor28BYJ_48=(
     {'_cclass': appval,     'name': 'stepsPerRev'   , 'value': 2048/12},    # motor and gearbox with 12:1 speedup to second hand
     {'_cclass': appval,     'name': 'maxrpm'        , 'value': 220},        # 1 rpm is 1 rotation of the second hand per minute
@@ -102,7 +149,8 @@ class tmc5130(trinamicDriver.TrinamicDriver):
     """
     A class specific to the TMC5130 chip. The detailed register definitions are held in the tmc5130regs module.
     """
-    def __init__(self, clockfrequ=15000000, settings=motor28BYJ_48, pigio=None, drvenpin=12, spiChannel=1, loglvl=logging.DEBUG):
+    def __init__(self, clockfrequ=15000000, settings=motor28BYJ_48, pigio=None, drvenpin=12, spiChannel=1,
+            spibackend='pigpio', diag1pin=None, loglvl=logging.DEBUG):
         """
         sets up a motor driver for the trinamic tm,c5130
         
@@ -111,6 +159,9 @@ class tmc5130(trinamicDriver.TrinamicDriver):
         settings     : a bunch of settings for the registers in the driver chip and some for this driver that override the default values
         
         pigio        : an instance of pigpio to use for communication with the trinamic chip, if None an instance is created
+
+        spibackend   : passed to the underlying driver - 'spidev' talks to /dev/spidev directly for the SPI
+                       transfers (pigpio still handles the gpio pins), avoiding the daemon round trip per frame
         
         loglvl       : sets the level used as the minimum for debug calls (no debug calls are made for levels below this value to improve
                         performance)
@@ -118,13 +169,18 @@ class tmc5130(trinamicDriver.TrinamicDriver):
         drvenpin     : broadcom pin to enable output drive for this motor - passed through
         
         spiChannel   : spi channel for this motor - passed through
+        
+        diag1pin     : broadcom pin wired to the chip's DIAG1 output, or None. When given, DIAG1 is set up as a
+                        push-pull position-compare output and wait_reached sleeps on its rising edge rather than a
+                        fixed tick, so arrival is noticed within a callback latency instead of ticktime/2 on average.
+                        The SPI confirmation read still decides when the wait is over - the edge only ends the sleep.
         """
         logging.basicConfig(
             level=logging.DEBUG if isinstance(loglvl, str) else loglvl, 
             format='%(asctime)s %(levelname)7s (%(process)d)%(threadName)12s  %(module)s.%(funcName)s: %(message)s',
             datefmt="%H:%M:%S")
         if pigio is None:
-            self.pg=pigpio.pi()
+            self.pg=getPigpio()
             self.mypio=True
         else:
             self.pg=pigio
@@ -135,28 +191,39 @@ class tmc5130(trinamicDriver.TrinamicDriver):
         self.clockfrequ=clockfrequ
         self.tconst=self.clockfrequ/2**24
         super().__init__(name='fred', parent=None, app=None, clockfrequ=self.clockfrequ, datarate=1000000, pigp=self.pg,
-                motordef=tmc5130regs.tmc5130, drvenpin=drvenpin, spiChannel=spiChannel, loglvl=loglvl )
+                motordef=tmc5130regs.tmc5130, drvenpin=drvenpin, spiChannel=spiChannel, spibackend=spibackend, loglvl=loglvl )
         self.makeChild(_cclass=treedict.Tree_dict, name='settings', childdefs=settings)
+        self.rpmscale=None          # lazily (re)built by RPMtoVREG / VREGtoRPM
+        self.usprnode=self['settings/uStepsPerRev']
+        self.diag1pin=diag1pin
+        if diag1pin is None:
+            self.posreached=None
+            self.diagcb=None
+        else:
+            self.posreached=threading.Event()
+            self.pg.set_mode(diag1pin, pigpio.INPUT)
+            self.diagcb=self.pg.callback(diag1pin, pigpio.RISING_EDGE, self.diagEdge)
         self['chipregs/IHOLD_IRUN/IHOLD'].set(10)
         self['chipregs/IHOLD_IRUN/IRUN'].set(15)
         self['chipregs/IHOLD_IRUN/IHOLDDELAY'].set(8)
-        regsettings=OrderedDict((   # base set of register values to get started
-                ('GSTAT',0),                                    # reads current and clears latching flags
-                ('IOIN', 0),                                    # gets the chip's version number
-                ('GCONF', tmc5130regs.GCONFflags.en_pwm_mode),  # sets stealth chop mode
-                ('CHOPCONF', 0x000100C3),
-                ('IHOLD_IRUN', None),                           # already setup above
-                ('TPOWERDOWN', 10),
-                ('TPWMTHRS', 0x000001F4),
-                ('VSTART', 30),
-                ('A1', 1500),
-                ('V1', 100000),
-                ('AMAX', 1000),
-                ('VMAX', round(self.RPMtoVREG(self['settings/maxrpm'].getCurrent()))),
-                ('DMAX', 1100),
-                ('D1', 600),
-                ('VSTOP', 40),
-                 ))
+        regsettings={   # base set of register values to get started - dicts keep insertion order
+                'GSTAT': 0,                                     # reads current and clears latching flags
+                'IOIN': 0,                                      # gets the chip's version number
+                'GCONF': tmc5130regs.GCONFflags.en_pwm_mode |   # sets stealth chop mode
+                        (tmc5130regs.GCONFflags.NONE if diag1pin is None else tmc5130regs.GCONFflags.diag1_poscomp_pushpull),
+                'CHOPCONF': 0x000100C3,
+                'IHOLD_IRUN': None,                             # already setup above
+                'TPOWERDOWN': 10,
+                'TPWMTHRS': 0x000001F4,
+                'VSTART': 30,
+                'A1': 1500,
+                'V1': 100000,
+                'AMAX': 1000,
+                'VMAX': round(self.RPMtoVREG(self['settings/maxrpm'].getCurrent())),
+                'DMAX': 1100,
+                'D1': 600,
+                'VSTOP': 40,
+                 }
         regactions='RRUWWWWWWWWWWWW'
         assert len(regsettings)==len(regactions)
         self.readWriteMultiple(regsettings,regactions)
@@ -167,8 +234,10 @@ class tmc5130(trinamicDriver.TrinamicDriver):
 
         vreg=(rpm*ustepsperrev) / (60*self.tconst)
         """
-        v1= (rpm*self['settings/uStepsPerRev'].getCurrent()/60) / self.tconst
-        return v1
+        scale=self.rpmscale
+        if scale is None:
+            scale=self.rpmscale=self['settings/uStepsPerRev'].getCurrent()/(60*self.tconst)
+        return rpm*scale
 
     def VREGtoRPM(self, regval):
         """
@@ -176,10 +245,13 @@ class tmc5130(trinamicDriver.TrinamicDriver):
         
         rpm=(vreg*60*tconst) / ustepsperrev
         """
-        return regval*60*self.tconst/self['settings/uStepsPerRev'].getCurrent()
+        scale=self.rpmscale
+        if scale is None:
+            scale=self.rpmscale=self['settings/uStepsPerRev'].getCurrent()/(60*self.tconst)
+        return regval/scale
 
     def posToREG(self, posn):
-        return round(self['settings/uStepsPerRev'].getCurrent()*posn)
+        return round(self.usprnode.getCurrent()*posn)
 
     def readState(self, statedict):
         """
@@ -198,18 +270,27 @@ class tmc5130(trinamicDriver.TrinamicDriver):
                 res[k]=self.settings[k]
         return res
 
+    def diagEdge(self, gpio, level, tick):
+        self.posreached.set()
+
     def wait_reached(self, ticktime=.5):
-        time.sleep(ticktime)
+        waitabit=time.sleep if self.posreached is None else self.posreached.wait
+        waitabit(ticktime)
         reads={'VACTUAL':0, 'XACTUAL':0, 'XTARGET':0, 'RAMPSTAT':0}
         self.readWriteMultiple(reads, 'R')
-        while not motorStatus.at_position in self['chipregs/SHORTSTAT'].curval:
-            print('loc    {location:9.2f}   chipVelocity  {velocity:9.2f}'.format(location=reads['XACTUAL']/self['settings/uStepsPerRev'].getCurrent(), velocity=reads['VACTUAL']))
-            print('ramp status: %s' % self['chipregs/SHORTSTAT'].curval)
-            time.sleep(ticktime)
+        uspr=self.usprnode.getCurrent()
+        shortstat=self.shortstat
+        atposn=motorStatus.at_position.value
+        dolog=logger.isEnabledFor(logging.DEBUG)
+        while not shortstat.curval & atposn:
+            if dolog:
+                logger.debug('loc    %9.2f   chipVelocity  %9.2f   ramp status: %s',
+                        reads['XACTUAL']/uspr, reads['VACTUAL'], shortstat.curval)
+            waitabit(ticktime)
             self.readWriteMultiple(reads, 'R')
         self.enableOutput(False)
-        print('target %9.4f reached (%d), status: %x, ramp status %s' % (reads['XACTUAL']/self['settings/uStepsPerRev'].getCurrent(), reads['XACTUAL'], 
-                    self['chipregs/SHORTSTAT'].curval, reads['RAMPSTAT']))
+        logger.info('target %9.4f reached (%d), status: %x, ramp status %s', reads['XACTUAL']/uspr, reads['XACTUAL'],
+                    shortstat.curval, reads['RAMPSTAT'])
 
     def waitStop(self, ticktime):
         time.sleep(ticktime)
@@ -217,24 +298,27 @@ class tmc5130(trinamicDriver.TrinamicDriver):
             time.sleep(ticktime)
 
     def goto(self, targetpos, speed=None, wait=False):
-        regupdates=OrderedDict((
-            ('VMAX', round(self.RPMtoVREG(self['settings/maxrpm'].getCurrent() if speed is None else speed))),
-            ('XTARGET', round(self['settings/uStepsPerRev'].getCurrent()*targetpos)),
-            ('RAMPMODE', tmc5130regs.RAMPmode.POSITION),
-             ))
+        regupdates={
+            'VMAX': round(self.RPMtoVREG(self['settings/maxrpm'].getCurrent() if speed is None else speed)),
+            'XTARGET': self.posToREG(targetpos),
+            'RAMPMODE': tmc5130regs.RAMPmode.POSITION,
+             }
+        if not self.posreached is None:
+            self.posreached.clear()
+            regupdates['X_COMPARE']=regupdates['XTARGET']    # DIAG1 pulses as the target position is crossed
         self.enableOutput(True)
         self.readWriteMultiple(regupdates,'W')
-        print('requested %d, recorded %d' % (regupdates['VMAX'], self['chipregs/VMAX'].curval))
+        logger.debug('requested %d, recorded %d', regupdates['VMAX'], self['chipregs/VMAX'].curval)
         if wait:
             self.wait_reached()
             self.enableOutput(False)
 
     def setspeed(self, speed):
-        regupdates=OrderedDict((
-            ('VMAX', round(self.RPMtoVREG(abs(speed)))),
-            ('RAMPMODE', tmc5130regs.RAMPmode.VELOCITY_FWD if speed >=0 else tmc5130regs.RAMPmode.VELOCITY_REV),
-            ))
-        print('rampmode requested: %s' % (regupdates['RAMPMODE']))
+        regupdates={
+            'VMAX': round(self.RPMtoVREG(abs(speed))),
+            'RAMPMODE': tmc5130regs.RAMPmode.VELOCITY_FWD if speed >=0 else tmc5130regs.RAMPmode.VELOCITY_REV,
+            }
+        logger.debug('rampmode requested: %s', regupdates['RAMPMODE'])
         self.enableOutput(True)
         self.readWriteMultiple(regupdates,'W')
 
@@ -245,9 +329,11 @@ class tmc5130(trinamicDriver.TrinamicDriver):
 
         Driver will ramp down to zero velocity and then position the rotor back to the new stop target.
         """
-        self.writeInt('XTARGET', self.readInt('XACTUAL'))
-        self.writeInt('VMAX', round(self.RPMtoVREG(self['settings/maxrpm'].getCurrent())))
-        self.writeInt('RAMPMODE', tmc5130regs.RAMPmode.POSITION)
+        self.writeMany({
+            'XTARGET': self.readInt('XACTUAL'),
+            'VMAX': round(self.RPMtoVREG(self['settings/maxrpm'].getCurrent())),
+            'RAMPMODE': tmc5130regs.RAMPmode.POSITION,
+            })
         self.waitStop(ticktime=.1)
         self.enableOutput(False)
 
@@ -265,16 +351,13 @@ class tmc5130(trinamicDriver.TrinamicDriver):
         # Set VMAX and VSTART to 0.  Copy values before overwriting.
         vstart = self['chipregs/VSTART'].curval
         vmax = self['chipregs/VMAX'].curval
-        self.writeInt('VSTART', 0)
-        self.writeInt('VMAX', 0)
+        self.writeMany({'VSTART': 0, 'VMAX': 0})
 
         # Wait for motor to stop
         self.waitStop(ticktime=.1)
 
         # Clear positioning moves and restore VMAX and VSTART
-        self.writeInt('XTARGET', self.readInt('XACTUAL'))
-        self.writeInt('VSTART', vstart)
-        self.writeInt('VMAX', vmax)
+        self.writeMany({'XTARGET': self.readInt('XACTUAL'), 'VSTART': vstart, 'VMAX': vmax})
 
         self.enableOutput(False)
 
@@ -296,34 +379,32 @@ class tmc5130(trinamicDriver.TrinamicDriver):
         """
 
         # Copy latest SW_MODE flags before modifying
+        swmode=self['chipregs/SWMODE']
         sw_mode = self.readInt('SWMODE')
 
-        # Enable hard stop and automatic motor stop when right/left switches are active
-        self['chipregs/SWMODE'].setFlag(tmc5130regs.SWMODEflags.en_softstop, False)
-        self['chipregs/SWMODE'].setFlag(tmc5130regs.SWMODEflags.stop_l_enable, True)
-        self['chipregs/SWMODE'].setFlag(tmc5130regs.SWMODEflags.stop_r_enable, True)
-
-        # Invert active polarity of right/left switches to simulate them being triggered
-        self['chipregs/SWMODE'].toggleFlag(tmc5130regs.SWMODEflags.pol_stop_l)
-        self['chipregs/SWMODE'].toggleFlag(tmc5130regs.SWMODEflags.pol_stop_r)
+        # Enable hard stop and automatic motor stop when right/left switches are active, and invert the
+        # active polarity of the switches to simulate them being triggered - composed as one bitmask update
+        swmode.curval = ((sw_mode & swmodeSoftstopOff) | swmodeStopEnables) ^ swmodeStopPolarity
 
         # Execute hard stop and wait
         self.writeInt('SWMODE', None)
         self.waitStop(ticktime=.1)
 
         # Clear any positioning or velocity moves
-        self.writeInt('XTARGET', self.readInt('XACTUAL'))
-        self.writeInt('VMAX', 0)
+        self.writeMany({'XTARGET': self.readInt('XACTUAL'), 'VMAX': 0})
 
         # Restore SW_MODE
-        self['chipregs/SWMODE'].curval = sw_mode
+        swmode.curval = sw_mode
         self.writeInt('SWMODE', None)
 
         self.enableOutput(False)
 
     def close(self):
         super().close()
+        if not self.diagcb is None:
+            self.diagcb.cancel()
+            self.diagcb=None
         if self.mypio:
-            self.pg.stop()
+            _dropPigpio(self.pg)
         self.pg=None
 
@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 """
-This module extends OrderedDict to support multiple levels. In effect a tree of dicts navigable
-using a filesystem like syntax.
+This module extends dict (which preserves insertion order on Python 3.7+) to support multiple levels.
+In effect a tree of dicts navigable using a filesystem like syntax.
 
 Each node (dict) in the tree links to its parent and to the top node of the tree, so navigation
 can be 'up' to the parent as well as 'down' to the children.
@@ -17,13 +17,15 @@ Examples:
                           child node 'siblingx' of the parent of the current node.
 """
 
-from collections import Hashable
-from collections import OrderedDict
+from itertools import islice
 
-class Tree_dict(OrderedDict):
+class Tree_dict(dict):
     """
     A class that places an object within a tree. Each node is basically a dict (empty for leaf nodes)
     """
+    __slots__=('name', 'parent', 'app', 'treeversion', 'pathcache', 'pathcacheversion', 'hiername')
+        # no __dict__ for plain tree nodes - subclasses that want arbitrary attributes get their own __dict__
+        # automatically by not declaring __slots__
     def __init__(self, *, name, parent, app, childdefs=None): # * forces all args to be used as keywords
         """
         Creates a node and links it from the parent (if present)
@@ -37,19 +39,28 @@ class Tree_dict(OrderedDict):
 
         childdefs   : iterable of definitions for child nodes, each to be the kwargs for calling makeChild
         
-        raises ValueError is the parent already has a child with this name, or if the name is not Hashable
+        raises ValueError if the parent already has a child with this name, or TypeError if the name is not hashable
+        (the dict insert raises that naturally - no need for an up-front isinstance check)
         """
-        assert isinstance(name, Hashable), 'the name given for variable {} is not hashable'.format(name)
         self.name=name
         self.parent=parent
-        self.app=self if app is None else app
+        if parent is None:
+            self.app=self if app is None else app
+            self.treeversion=0  # bumped whenever a node is added anywhere, so cached path lookups can be validated
+        else:
+            self.app=parent.app
+        self.pathcache=None
+        self.pathcacheversion=-1
+        self.hiername=None      # lazily built by getHierName - nodes are never re-parented so it can't go stale
         if not parent is None:
-            assert not self.name in parent, 'the parent %s already has a child %s' % (parent.name, self.name) 
-            parent[self.name]=self
+            if name in parent:
+                raise ValueError('the parent %s already has a child %s' % (parent.name, name))
+            parent[name]=self
+            self.app.treeversion += 1
+        super().__init__()
         if not childdefs is None:
             for cdef in childdefs:
                 self.makeChild(**cdef)
-        super().__init__()
 
     def makeChild(self, _cclass, name, **kwargs):
         """
@@ -58,17 +69,22 @@ class Tree_dict(OrderedDict):
         return _cclass(name=name, parent=self, app=self.app, **kwargs)
 
     def __getitem__(self, nname):
-        splitname=nname.split(self.hiernamesep)
-        if len(splitname)==1:
+        if self.hiernamesep not in nname:
+            # fast path for the overwhelmingly common plain child name - no split, just a dict lookup
             if nname=='..':
                 return self.parent
-            else:
-                try:
-                    return super().__getitem__(nname)
-                except KeyError:
-                    raise KeyError('key %s not found in %s' % (nname, str(self.keys())))
+            try:
+                return super().__getitem__(nname)
+            except KeyError:
+                raise KeyError('key %s not found in %s' % (nname, str(self.keys())))
+        cache=self.pathcache
+        if cache is None or self.pathcacheversion != self.app.treeversion:
+            cache=self.pathcache={}
+            self.pathcacheversion=self.app.treeversion
+        elif nname in cache:
+            return cache[nname]
         cnode=self
-        for pname in splitname:
+        for pname in nname.split(self.hiernamesep):
             if pname=='':
                 cnode=self.app
             elif pname=='..':
@@ -78,6 +94,7 @@ class Tree_dict(OrderedDict):
                     cnode=cnode.__getitem__(pname)
                 except KeyError:
                     raise KeyError('key %s not found in %s' % (pname, str(cnode.keys())))
+        cache[nname]=cnode
         return cnode
 
     def nextChild(self, name=None, filter=None, forward=True, wrap=True):
@@ -88,46 +105,63 @@ class Tree_dict(OrderedDict):
         
         returns the first (filtered) child if name is None, or the next sibling unless wrap is False and is is the last /  first child
         """
-        ili=[li for li in list(self.items()) if filter is None or filter(li[1])]
-        if len(ili)==0:
+        # single pass - scanning backwards is just the same scan over the reversed (C level) iterator
+        first=None
+        found=None
+        seen=False
+        for li in (self.items() if forward else reversed(self.items())):
+            if filter is None or filter(li[1]):
+                if first is None:
+                    first=li
+                if seen:
+                    found=li
+                    break
+                if li[0]==name:
+                    seen=True
+        if first is None:
             return None, None
         if name is None:
-            return ili[0] if forward else ili[-1]
-        ilk=[i[0] for i in ili]
-        ix = ilk.index(name) + (1 if forward else -1)
-        if ix >= len(ilk):
-            if wrap:
-                ix = 0
-            else:
-                return None, None
-        if ix < 0:
-            if wrap:
-                ix=len(ili)-1
-            else:
-                return None, None
-        return ili[ix]
+            return first
+        if not seen:
+            raise ValueError('%s is not a (filtered) child of %s' % (name, self.name))
+        if not found is None:
+            return found
+        if wrap:
+            return first    # may be the named child itself if it is the only match
+        return None, None
 
     hiernamesep='/'
 
     def getHierName(self):
         """
         returns the hierarchic name of this variable.
-        
-        Returns a string using hiernamesep to separate each ancestor's name. 
+
+        Returns a string using hiernamesep to separate each ancestor's name. The name is built on first use and
+        cached - the parents cache theirs too, so resolving a whole tree is linear in the node count.
         """
-        if self.parent is None:
-            return self.name
-        else:
-            return self.parent.getHierName()+self.hiernamesep+self.name
+        if self.hiername is None:
+            if self.parent is None:
+                self.hiername=self.name
+            else:
+                self.hiername=self.parent.getHierName()+self.hiernamesep+self.name
+        return self.hiername
 
     def __repr__(self):
         if len(self) == 0:
             return "{} name={}, leaf node".format(self.__class__.__name__, self.name)
         else:
-            return "{} name={}, children {}".format(self.__class__.__name__, self.name, list(self.keys()))
+            # bound the preview - repr of a node with many children shouldn't list the whole register set
+            preview=list(islice(self.keys(), 8))
+            return "{} name={}, children {}{}".format(self.__class__.__name__, self.name, preview,
+                    ' +{} more'.format(len(self)-8) if len(self)>8 else '')
 
     def pretty(self, indent=0, depth=5):
-        if len(self)==0 or indent >= depth:
-            return '   '*indent+str(self)
-        else:
-            return '   '*indent+str(self)+'\n'+'\n'.join([c.pretty(indent=indent+1, depth=depth) for c in self.values()])
\ No newline at end of file
+        # iterative preorder walk appending to one list - a single join at the end rather than a join per level
+        out=[]
+        stack=[(self, indent)]
+        while stack:
+            node, ind=stack.pop()
+            out.append('   '*ind+str(node))
+            if len(node) and ind < depth:
+                stack.extend((c, ind+1) for c in reversed(list(node.values())))
+        return '\n'.join(out)
\ No newline at end of file
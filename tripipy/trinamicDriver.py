@@ -12,10 +12,29 @@ that control the chip's operation. It also manages a couple of extra gpio pins t
 """
 import logging
 import pigpio
+import queue
+import struct
+import threading
 import time
+from collections import namedtuple
+from concurrent.futures import Future
 from enum import IntFlag, auto
 from tripipy import treedict
 
+frameU32=struct.Struct('>xI')   # a 5 byte SPI frame: status / address byte then 32 bits of big-endian data
+frameOut=struct.Struct('>BI')   # outbound frame: address byte then 32 bits of big-endian data - packs in one C call
+
+spiIocTransfer=struct.Struct('QQIIHBBBBH')  # struct spi_ioc_transfer: tx_buf, rx_buf, len, speed_hz,
+                                            # delay_usecs, bits_per_word, cs_change, tx_nbits, rx_nbits, pad
+SPI_IOC_MESSAGE_BASE=0x40006b00             # _IOW('k', 0, ...) with the message size ORed into bits 16-29
+
+logREGFMT='%s %-10s: %9d (%08x) raw: %s'   # shared by the WRITE / READ register log lines
+
+regdef=namedtuple('regdef', ('rclass', 'rargs'))
+"""
+an immutable definition of a single register: the register class to instantiate and the kwargs to pass it.
+"""
+
 class TrinamicDriver(treedict.Tree_dict):
     """
     This class supports various Trinamic chips with an SPI interface (such as the 5130 or 5160).
@@ -62,7 +81,8 @@ class TrinamicDriver(treedict.Tree_dict):
     motors from a single Raspberry pi.
     """
     def __init__(self, masterspi=True, spiChannel=0, mode=3, datarate=1000000, cslow=True, datacount=32,
-            resetpin=2, drvenpin=3, clockpin=4, clockfrequ=None, pigp={}, motordef=None, loglvl=logging.INFO, **kwargs):
+            resetpin=2, drvenpin=3, clockpin=4, clockfrequ=None, pigp={}, motordef=None, loglvl=logging.INFO,
+            spibackend='pigpio', **kwargs):
         """
         Initialises the tmc5130
         
@@ -92,7 +112,11 @@ class TrinamicDriver(treedict.Tree_dict):
         pigp:       instance of pigpio to use
 
         motordef:   Definitions of the the various registers and other motor information
-        
+
+        spibackend: 'pigpio' routes SPI transfers through the pigpio daemon (the default); 'spidev' talks to
+                    /dev/spidev directly via the python spidev module, which avoids a socket round trip to the
+                    daemon per transfer. pigpio is still used for the reset / enable / clock gpio pins.
+
         loglvl:     controls the logging from. 
                     loglvl is None, no logging is performed (apart from a critical warning if pigpio is broken)
                     loglvl integer >= logging.DEBUG, logging of most activity to logger <classname>.<name> using various levels
@@ -107,9 +131,10 @@ class TrinamicDriver(treedict.Tree_dict):
             raise RuntimeError("pigpio daemon does not appear to be running")
         super().__init__(**kwargs)
         self.loglvl = loglvl if loglvl is None or isinstance(loglvl,int) else logging.DEBUG
-        self.logger=None if self.loglvl is None else logging.getLogger(type(self).__name__ + '.' + self.name)
-        self.SPIlog=logging.getLogger(type(self).__name__ + '.' + self.name + '.SPI') if loglvl in ('commands', 'all') else None
-        self.SPIrawlog=logging.getLogger(type(self).__name__ + '.' + self.name + '.SPI') if loglvl in ('rawspi', 'all') else None
+        logbase=type(self).__name__ + '.' + self.name
+        self.logger=None if self.loglvl is None else logging.getLogger(logbase)
+        self.SPIlog=logging.getLogger(logbase + '.SPI') if loglvl in ('commands', 'all') else None
+        self.SPIrawlog=logging.getLogger(logbase + '.SPI') if loglvl in ('rawspi', 'all') else None
         assert isinstance(masterspi,bool)
         assert isinstance(spiChannel,int) and 0<=spiChannel<=2
         assert isinstance(mode,int) and 0<=mode<=3
@@ -118,9 +143,12 @@ class TrinamicDriver(treedict.Tree_dict):
         assert isinstance(resetpin,int) and 0<=resetpin<=53
         assert isinstance(drvenpin,int) and 0<=drvenpin<=53
         assert clockpin is None or (isinstance(clockpin,int) and 0<=clockpin<=53)
+        assert spibackend in ('pigpio', 'spidev')
         assert isinstance(motordef, dict)       # testing for dict is a bit strict but will do for now
         self.vccio=resetpin                       
         self.drvenable=drvenpin
+        self.vcciomask=1<<resetpin      # bank masks let reset / enable toggle several pins in one daemon call
+        self.drvenmask=1<<drvenpin
         self.clockpin=clockpin
         self.clockfrequ=clockfrequ
         self.spiChannel=spiChannel
@@ -128,14 +156,33 @@ class TrinamicDriver(treedict.Tree_dict):
         self.datarate=datarate
         self.cslow=cslow
         self.masterspi=masterspi
+        # pigpio spi_flags: bits 0-1 are the mode, bits 2-4 make the matching chip select active high and
+        # bit 8 selects the auxiliary interface. Computed once here - the old inline expression fell foul
+        # of python's conditional-expression precedence and could yield the wrong flags.
+        spiflags=mode & 3
+        if not cslow:
+            spiflags |= 1 << (2 + spiChannel)
+        if not masterspi:
+            spiflags |= 256
+        self.spiflags=spiflags
+        self.spibackend=spibackend
         self.resetChip()
         self.setupIO()
         self.motordef=motordef
         regs=self.makeChild(_cclass=treedict.Tree_dict, name='chipregs')
         for rn, rdef in self.motordef['regNames'].items():
-            rc=rdef['rclass']
-            regs.makeChild(_cclass=rc, name=rn, **rdef['rargs'])
+            regs.makeChild(_cclass=rdef.rclass, name=rn, **rdef.rargs)
         regs['SHORTSTAT'].loadByte(0)
+        # writeInt / readInt / readWriteMultiple resolve registers by name many times a second, so snapshot
+        # the name -> register map once here rather than re-walking the tree path on every access. The
+        # register set is fixed after setup so the snapshot cannot go stale.
+        self.regbyname=dict(regs)
+        self.shortstat=regs['SHORTSTAT']
+        self.dummyframe=bytearray(5)    # reusable buffer for the trailing dummy frame in readWriteMultiple
+        self.lastreq=None               # address the most recent frame sent was reading, None if it was a write
+        self.spiqueue=None              # request queue + worker thread for the async variants, made on first use
+        self.spithread=None
+        self.queuedwrites={}            # register writes gathered by queueWrite awaiting the next flush
         if self.logger:
             self.logger.info("controller initialised using spi {spi} on channel {spich}, {clock}.".format(
                     spi='master' if self.masterspi else 'aux',
@@ -157,20 +204,87 @@ class TrinamicDriver(treedict.Tree_dict):
                 self.pigp.write(self.clockpin, 0)
             else:
                 self.pigp.hardware_clock(self.clockpin, self.clockfrequ)
-        self.spidev=self.pigp.spi_open(self.spiChannel,baud=self.datarate,
-                spi_flags=self.spimode + 0 if self.cslow else self.spiChannel<<4 + 0 if self.masterspi else 256)
+        if self.spibackend=='spidev':
+            import spidev                       # only needed for this backend so import here
+            self.spi=spidev.SpiDev()
+            # the main SPI controller is /dev/spidev0.*, the auxiliary one /dev/spidev1.*
+            self.spi.open(0 if self.masterspi else 1, self.spiChannel)
+            self.spi.mode=self.spimode
+            self.spi.max_speed_hz=self.datarate
+            self.spidev=None
+        else:
+            self.spi=None
+            self.spidev=self.pigp.spi_open(self.spiChannel,baud=self.datarate, spi_flags=self.spiflags)
+
+    def spiWrite(self, ba):
+        """
+        sends a single frame to the chip, discarding whatever the chip sends back
+        """
+        if self.spi is None:
+            self.pigp.spi_write(self.spidev, ba)
+        else:
+            self.spi.writebytes2(ba)
+
+    def spiXfer(self, ba):
+        """
+        sends a single frame to the chip, returning (byte count, response bytes)
+        """
+        if self.spi is None:
+            return self.pigp.spi_xfer(self.spidev, ba)
+        rx=bytearray(self.spi.xfer3(list(ba)))  # bytearray so callers can struct-decode / hex it like the pigpio result
+        return len(rx), rx
+
+    def spiXferMany(self, frames):
+        """
+        sends several frames with chip select released between them, returning a list of 5 byte responses.
+
+        With the spidev backend the whole batch goes to the kernel in a single SPI_IOC_MESSAGE ioctl using one
+        spi_ioc_transfer segment per frame (cs_change set on all but the last), so K frames cost 1 syscall
+        instead of K. The pigpio daemon has no equivalent, so that backend just loops over spiXfer.
+        """
+        if self.spi is None:
+            return [self.spiXfer(ba)[1] for ba in frames]
+        import ctypes, fcntl
+        nframes=len(frames)
+        txbuf=bytearray(b''.join(frames))           # one contiguous buffer each way - the segments point into it
+        rxbuf=bytearray(nframes*5)
+        txaddr=ctypes.addressof(ctypes.c_char.from_buffer(txbuf))
+        rxaddr=ctypes.addressof(ctypes.c_char.from_buffer(rxbuf))
+        msg=bytearray(nframes*spiIocTransfer.size)
+        for i in range(nframes):
+            spiIocTransfer.pack_into(msg, i*spiIocTransfer.size, txaddr+i*5, rxaddr+i*5, 5, self.datarate, 0, 8,
+                    1 if i<nframes-1 else 0, 0, 0, 0)
+        fcntl.ioctl(self.spi.fileno(), SPI_IOC_MESSAGE_BASE | (len(msg)<<16), msg)
+        rxview=memoryview(rxbuf)
+        return [rxview[i*5:i*5+5] for i in range(nframes)]     # memoryview slices - no per-frame copy
 
     def resetChip(self):
         """
         This should reset the chip
         """
+        self.resetBegin()
+        self.resetEnd()
+
+    def resetBegin(self):
+        """
+        starts a chip reset by pulling the enable and VCC_IO pins low.
+
+        Pair with resetEnd after at least 100ms. With several motors call resetBegin on each then resetEnd
+        on each - the low period then elapses once for the whole set instead of once per chip.
+        """
         self.pigp.set_mode(self.vccio, pigpio.OUTPUT)
         self.pigp.set_mode(self.drvenable, pigpio.OUTPUT)
-        self.pigp.write(self.drvenable,0)
-        self.pigp.write(self.vccio,0)
-        time.sleep(.1)
-        self.pigp.write(self.vccio,1)
-        self.pigp.write(self.drvenable,1)
+        self.pigp.clear_bank_1(self.drvenmask | self.vcciomask)
+        self.resetlowuntil=time.monotonic()+.1
+
+    def resetEnd(self):
+        """
+        completes a reset started by resetBegin, sleeping out only whatever remains of the low period.
+        """
+        remaining=self.resetlowuntil-time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        self.pigp.set_bank_1(self.drvenmask | self.vcciomask)
         if self.logger:
             self.logger.info("chip reset attempted")
 
@@ -179,14 +293,14 @@ class TrinamicDriver(treedict.Tree_dict):
         use this to enable or disable the mosfet output drivers
         """
         if not self.pigp is None and self.pigp.connected:
-            self.pigp.write(self.drvenable, 0 if enabled is True else 1)
+            (self.pigp.clear_bank_1 if enabled is True else self.pigp.set_bank_1)(self.drvenmask)
             if self.logger:
                 pass
 #                self.logger.debug("output drivers " + "enabled" if enabled else "disabled")
         elif self.logger:
             self.logger.warning("output driver (dis)enable requested but pigpio not availalble")
 
-    def writeInt(self, regName, regValue=None):
+    def writeInt(self, regName, regValue=None, force=False):
         """
         Writes immediately to a single register in the Trinamic chip
         
@@ -194,21 +308,32 @@ class TrinamicDriver(treedict.Tree_dict):
         
         regValue: a value interpreted as a simple 32 bit integer that will be written to the chip.
                   Note: if this is None writeBytes picks the current value saved in the instance
+
+        force:   send the frame even when the chip is known to hold this value already. Normally a write
+                 whose value matches a clean cache is skipped - the cheapest transfer is the one not made.
+                 Use force after anything that may have disturbed the chip behind the driver's back.
         """
+        if self.queuedwrites:
+            self.flush()
         if self.SPIlog:
             cstart=time.perf_counter_ns()
             cpustart=time.process_time_ns()
-        ba=[0]*5
-        creg=self['chipregs/'+regName]
+        creg=self.regbyname[regName]
+        if not force and not regValue is None and creg.dirty is False and creg.getCurrent()==regValue:
+            return      # clean cache already holds this value - the chip state would not change
+        ba=creg.framebuf
         creg.writeBytes(ba, value=regValue)
-        self.pigp.spi_write(self.spidev, ba)
+        self.spiWrite(ba)
+        creg.dirty=False
+        self.lastreq=None
         if self.SPIrawlog:
-            self.SPIrawlog.debug('SPI_WRITE: ' + ':'.join("{:02x}".format(c) for c in ba))
+            self.SPIrawlog.debug('SPI_WRITE: %s', ba.hex(':'))
         if self.SPIlog:
             clockns=time.perf_counter_ns()-cstart
             cpuratio=(time.process_time_ns()-cpustart)/clockns*100
-            self.SPIlog.debug("WRITE" + " {regname:10s}: {regval:9d} ({regval:08x}) {clockus:6.1f}uS {cpu:4.1f}%CPU".format(
-                    regname=str(regName), regval=creg.getCurrent(), clockus=clockns/1000, cpu=cpuratio,))
+            regval=creg.getCurrent()
+            self.SPIlog.debug("WRITE %-10s: %9d (%08x) %6.1fuS %4.1f%%CPU",
+                    regName, regval, regval, clockns/1000, cpuratio)
 
     def readInt(self, regName):
         """
@@ -220,26 +345,33 @@ class TrinamicDriver(treedict.Tree_dict):
         
         returns the integer value of the register.
         """
+        if self.queuedwrites:
+            self.flush()
         if self.SPIlog:
             cstart=time.perf_counter_ns()
             cpustart=time.process_time_ns()
-        ba=[0]*5
-        rrr=self['chipregs/'+regName]
+        rrr=self.regbyname[regName]
+        ba=rrr.framebuf
         rrr.readBytes(ba)
-        self.pigp.spi_write(self.spidev, ba)
-        bblen, bytesback = self.pigp.spi_xfer(self.spidev, ba)
+        if self.lastreq != rrr.addr:
+            # the chip answers a read request in the following datagram, so prime it with the request frame
+            # first. When the previous frame sent was already a read of this register (a polling loop), the
+            # priming frame is skipped - the value collected below was then sampled at the previous exchange.
+            self.spiWrite(ba)
+        bblen, bytesback = self.spiXfer(ba)
+        self.lastreq=rrr.addr
         assert bblen==5
         if self.SPIrawlog:
-            self.SPIrawlog.debug('SPI_WRITE: ' + ':'.join("{:02x}".format(c) for c in ba))
-            self.SPIrawlog.debug('SPI_XFER : ' + ':'.join("{:02x}".format(c) for c in ba) + ' returned ' + ':'.join("{:02x}".format(c) for c in bytesback))
+            self.SPIrawlog.debug('SPI_WRITE: %s', ba.hex(':'))
+            self.SPIrawlog.debug('SPI_XFER : %s returned %s', ba.hex(':'), bytesback.hex(':'))
         rrr.loadBytes(bytesback)
         resint=rrr.curval
-        self['chipregs/SHORTSTAT'].loadByte(bytesback[0])
+        self.shortstat.loadByte(bytesback[0])
         if self.SPIlog:
             clockns=time.perf_counter_ns()-cstart
             cpuratio=(time.process_time_ns()-cpustart)/clockns*100
-            self.SPIlog.log(self.loglvl," READ  {regname:10s}: {resint:9d} ({resint:08x}) status: {stat:02x} {clockus:6.1f}uS {cpu:4.1f}%CPU".format(
-                    stat=bytesback[0], regname=str(regName),  resint=resint, clockus=clockns/1000, cpu=cpuratio))
+            self.SPIlog.log(self.loglvl," READ  %-10s: %9d (%08x) status: %02x %6.1fuS %4.1f%%CPU",
+                    regName, resint, resint, bytesback[0], clockns/1000, cpuratio)
         return resint
 
     def readWriteMultiple(self, regNameList, regActions='R'):
@@ -260,6 +392,8 @@ class TrinamicDriver(treedict.Tree_dict):
                         'W' - write the register
                         'U' - write the register and read back the value
         """
+        if self.queuedwrites:
+            self.flush()
         if self.SPIlog:
             cstart=time.perf_counter_ns()
             cpustart=time.process_time_ns()
@@ -270,69 +404,159 @@ class TrinamicDriver(treedict.Tree_dict):
             resp={}
             regList=regNameList
         assert len(regActions)==1 or len(regActions)==len(regNameList)
-        prevname=regList[0]
-        # check the first action - if read use dummy data, otherwise put the value in the buffer
-        prevrr=self['chipregs/'+prevname]
-        if regActions[0] == 'R':
-            ba=[0]*5
-            prevrr.readBytes(ba)
-        else:
-            ba=[0]*5
-            prevrr.writeBytes(ba, value=regNameList[prevname])
-            if self.SPIlog:
-                self.SPIlog.log(self.loglvl,"WRITE" + " {regname:10s}: {regval:9d} ({regval:08x}) raw: {raw}".format(
-                        regname=str(prevname), regval=regNameList[prevname], raw=":".join("{:02x}".format(c) for c in ba)))
-        self.pigp.spi_write(self.spidev, ba)
-        if self.SPIrawlog:
-            self.SPIrawlog.debug('SPI_WRITE: ' + ':'.join("{:02x}".format(c) for c in ba))
-        readback = not regActions[0]=='W'       # leave a flag that we want to get the value from the next response
-        for i, reg in enumerate(regList[1:]):
-            useindex=0 if len(regActions)==1 else i
-            rrr=self['chipregs/'+reg]
-            if regActions[useindex]=='R':
+        # first pass: build every frame up front so the transfer loop below does nothing but I/O and decode.
+        # Note the chip delimits datagrams by chip select, and spi_xfer holds chip select for the whole buffer,
+        # so the frames cannot be concatenated into a single transfer - each one needs its own spi_xfer.
+        if len(regActions)==1:
+            regActions=regActions*len(regList)      # expand once so the build loop needs no per register length test
+        pending=[]
+        seen=set()
+        for reg, action in zip(regList, regActions):
+            rrr=self.regbyname[reg]
+            # a register named twice in one batch (only possible with a list of reads) must not share its
+            # cached framebuf - the second build would clobber the first frame before anything is sent
+            ba=rrr.framebuf if reg not in seen else bytearray(5)
+            seen.add(reg)
+            if action=='R':
                 rrr.readBytes(ba)
             else:
-                rrr.writeBytes(ba,value=regNameList[reg])
+                rrr.writeBytes(ba, value=regNameList[reg])
+                rrr.dirty=False
                 if self.SPIlog:
-                    self.SPIlog.log(self.loglvl,"WRITE" + " {regname:10s}: {regval:9d} ({regval:08x}) raw: {raw}".format(
-                        regname=str(reg), regval=regNameList[reg], raw=":".join("{:02x}".format(c) for c in ba)))
-            bblen, bytesback = self.pigp.spi_xfer(self.spidev, ba)
-            if self.SPIrawlog:
-                self.SPIrawlog.debug('SPI_XFER : ' + ':'.join("{:02x}".format(c) for c in ba) + ' returned ' + ':'.join("{:02x}".format(c) for c in bytesback))
+                    # log the value actually packed into the frame - the supplied value may be None
+                    # (write the cached value) or an enum, neither of which fits the %d format
+                    rawval=frameU32.unpack_from(ba)[0]
+                    self.SPIlog.log(self.loglvl, logREGFMT,
+                        'WRITE', reg, rawval, rawval, ba.hex(':'))
+            # the bound loadBytes doubles as the readback flag - the transfer loop calls it directly
+            pending.append((ba, reg, rrr, rrr.loadBytes if action != 'W' else None))
+        # the chip returns each response in the following datagram, so when the final frame expects a readback,
+        # repeat it with the write bit cleared as a dummy to collect that response. A pure write tail needs no
+        # dummy - the status byte still arrives with the final write frame's own exchange.
+        if pending[-1][3]:
+            dummy=self.dummyframe
+            dummy[:]=pending[-1][0]
+            dummy[0] &= 127
+            pending.append((dummy, None, None, None))
+        responses=self.spiXferMany([p[0] for p in pending])
+        prevreg=None
+        prevrr=None
+        readback=None
+        SPIrawlog=self.SPIrawlog    # bind the per-iteration lookups to locals - the loop body is pure decode
+        SPIlog=self.SPIlog
+        for (ba, reg, rrr, loader), bytesback in zip(pending, responses):
+            if SPIrawlog:
+                SPIrawlog.debug('SPI_XFER : %s returned %s', ba.hex(':'), bytesback.hex(':'))
             if readback:
-                assert bblen==5
-                prevrr.loadBytes(bytesback)
-                resp[prevname]=prevrr.curval
-                if self.SPIlog:
-                    self.SPIlog.log(self.loglvl,"READ " + " {regname:10s}: {regval:9d} ({regval:08x}) raw: {raw}".format(
-                        regname=str(prevname), regval=resp[prevname], raw=":".join("{:02x}".format(c) for c in bytesback)))
-            prevname=reg
+                readback(bytesback)
+                resp[prevreg]=prevrr.curval
+                if SPIlog:
+                    SPIlog.log(self.loglvl, logREGFMT,
+                        'READ ', prevreg, resp[prevreg], resp[prevreg], bytesback.hex(':'))
+            prevreg=reg
             prevrr=rrr
-            readback=not regActions[useindex]=='W'
-        ba[0] = ba[0] & 127
-        bblen, bytesback = self.pigp.spi_xfer(self.spidev, ba)
-        if self.SPIrawlog:
-            self.SPIrawlog.debug('SPI_XFER : ' + ':'.join("{:02x}".format(c) for c in ba) + ' returned ' + ':'.join("{:02x}".format(c) for c in bytesback))
-        assert bblen==5
-        self['chipregs/SHORTSTAT'].loadByte(bytesback[0])
-        if readback:
-            prevrr.loadBytes(bytesback)
-            resp[prevname]=prevrr.curval
-            if self.SPIlog:
-                self.SPIlog.log(self.loglvl,"READ " + " {regname:10s}: {regval:9d} ({regval:08x}) raw: {raw}".format(
-                    regname=str(prevname), regval=resp[prevname], raw=":".join("{:02x}".format(c) for c in bytesback)))
+            readback=loader
+        self.lastreq=ba[0] if ba[0]<128 else None
+        self.shortstat.loadByte(bytesback[0])
         if self.SPIlog:
             clockns=time.perf_counter_ns()-cstart
             cpuratio=(time.process_time_ns()-cpustart)/clockns*100
-            self.SPIlog.log(self.loglvl,"Status: {stat:s}, SPI timing: {clockus:6.1f}uS {cpu:4.1f}%CPU".format(stat=self['chipregs/SHORTSTAT'].curval,
-                    clockus=clockns/1000, cpu=cpuratio))
+            self.SPIlog.log(self.loglvl,"Status: %s, SPI timing: %6.1fuS %4.1f%%CPU",
+                    self.shortstat.curval, clockns/1000, cpuratio)
         return resp
 
+    def readMany(self, regNames):
+        """
+        reads several registers in one burst - convenience wrapper on readWriteMultiple.
+
+        regNames: an iterable of register names; returns a dict of name -> value read.
+        """
+        return self.readWriteMultiple(list(regNames), regActions='R')
+
+    def writeMany(self, updates):
+        """
+        writes several registers in one burst - convenience wrapper on readWriteMultiple.
+
+        updates: a dict of register name -> value. A batch of n writes costs 1 call to the SPI backend setup
+                 rather than n, which matters when each call is a socket round trip to the pigpio daemon.
+        """
+        return self.readWriteMultiple(updates, regActions='W')
+
+    def queueWrite(self, regName, regValue):
+        """
+        queues a register write to be sent with the next flush (or automatically before the next read or
+        write). A later queued write to the same register just replaces the earlier value, so a control loop
+        can gather its updates and pay for one burst instead of a round trip per register.
+        """
+        self.queuedwrites[regName]=regValue
+
+    def flush(self):
+        """
+        sends any queued writes as a single burst. The read / write methods call this first themselves, so
+        queued writes can never be overtaken by later traffic.
+        """
+        if self.queuedwrites:
+            qw=self.queuedwrites
+            self.queuedwrites={}    # cleared before sending - writeMany routes back through readWriteMultiple
+            self.writeMany(qw)
+
+    def _spiWorker(self):
+        """
+        services the async request queue - each entry is (method, args, Future). Runs until a None sentinel
+        arrives (pushed by close). Register state (curval etc.) is only touched from this thread while async
+        access is in use, so no locking is needed.
+        """
+        while True:
+            item=self.spiqueue.get()
+            if item is None:
+                break
+            func, args, fut=item
+            try:
+                fut.set_result(func(*args))
+            except Exception as ex:
+                fut.set_exception(ex)
+
+    def _spiEnqueue(self, func, *args):
+        if self.spiqueue is None:
+            self.spiqueue=queue.Queue()
+            self.spithread=threading.Thread(target=self._spiWorker, name=self.name+'-spi', daemon=True)
+            self.spithread.start()
+        fut=Future()
+        self.spiqueue.put((func, args, fut))
+        return fut
+
+    def writeIntAsync(self, regName, regValue=None):
+        """
+        as writeInt, but queues the request to a background thread and returns a concurrent.futures.Future
+        immediately, so the caller's compute overlaps the SPI round trip. Once async access is in use all
+        chip traffic should go through the async variants - they are serviced strictly in order by one thread.
+        """
+        return self._spiEnqueue(self.writeInt, regName, regValue)
+
+    def readIntAsync(self, regName):
+        """
+        as readInt but returns a Future for the value - see writeIntAsync.
+        """
+        return self._spiEnqueue(self.readInt, regName)
+
+    def readWriteMultipleAsync(self, regNameList, regActions='R'):
+        """
+        as readWriteMultiple but returns a Future for the response dict - see writeIntAsync.
+        """
+        return self._spiEnqueue(self.readWriteMultiple, regNameList, regActions)
+
     def close(self):
+        if not self.spithread is None:
+            self.spiqueue.put(None)     # let the worker drain outstanding requests then stop
+            self.spithread.join()
+            self.spithread=None
         if not self.pigp is None and self.pigp.connected:
             self.pigp.write(self.drvenable,1)   # if we still have a working pigpio, set the enable pin high to 
                                                 # stop current flowing (disable the chip output stage)
         try:
+            if not self.spi is None:
+                self.spi.close()
+                self.spi=None
             if not self.spidev is None:
                 self.pigp.spi_close(self.spidev)
                 self.spidev=None
@@ -362,6 +586,9 @@ class triRegister(treedict.Tree_dict):
     fields. The actual value of the register is held at this level for full registers and for bit field registers.
     
     """
+    __slots__=('addr', 'writeaddr', 'framebuf', 'rflags', 'dirty')
+        # slot-backed like Tree_dict itself - a chip has 40+ register instances per motor
+
     def __init__(self, addr, access, logacts=[], **kwargs):
         """
         sets up basic info on the register
@@ -371,6 +598,9 @@ class triRegister(treedict.Tree_dict):
         """
         assert 0 <= int(addr) < 128
         self.addr=int(addr)
+        self.writeaddr=self.addr | 128  # command byte with the write bit baked in - saves an OR per packed frame
+        self.framebuf=bytearray(5)  # each register owns its SPI frame buffer - steady state transfers then allocate nothing
+        self.dirty=True
         self.rflags = regFlags.readable if 'R' in access else regFlags.NONE
         if 'W' in access:
             self.rflags |= regFlags.writeable
@@ -380,6 +610,9 @@ class triRegister(treedict.Tree_dict):
             print('exception in reg setup', kwargs)
             raise
 
+    # dirty is True whenever the cached value may differ from the chip; cleared on send / chip read.
+    # It starts True so registers with untracked updates are always written.
+
     def getCurrent(self):
         """
         returns the current value in the register - the last (or about to be) written value for write only regs, or the last
@@ -393,9 +626,9 @@ class triRegister(treedict.Tree_dict):
 
     def readBytes(self, ba):
         """
-        puts the register number in the first byte of the given buffer
+        sets up the given buffer as a read request - register number then zeroed data bytes
         """
-        ba[0]=self.addr
+        frameOut.pack_into(ba, 0, self.addr, 0)
 
     def writeVal(self, value):
         """
@@ -405,21 +638,19 @@ class triRegister(treedict.Tree_dict):
 
     def packBytes(self, ba, rawval):
         if regFlags.writeable in self.rflags:
-            ba[0]=self.addr | 128
-            ba[1]=(rawval>>24) & 255
-            ba[2]=(rawval>>16) & 255
-            ba[3]=(rawval>>8) & 255
-            ba[4]=rawval & 255
+            frameOut.pack_into(ba, 0, self.writeaddr, rawval & 0xffffffff)
         else:
             raise ValueError('register %s does not allow write' % self.name)
 
     def unpackBytes(self, ba):
-        return ((ba[1]<<24) | (ba[2]<<16) | (ba[3]<<8) | ba[4])
+        return frameU32.unpack_from(ba)[0]      # precompiled struct - decodes in place with no slice allocation
 
 class triHex(triRegister):
     """
     basic class where we just do it in hex. Used as a backstop for registers we don't care about yet.
     """
+    __slots__=('curval',)
+
     def getCurrent(self):
         return self.curval
 
@@ -428,6 +659,7 @@ class triHex(triRegister):
         called when a new value read from the chip: updates the last known chip value
         """
         self.curval=value
+        self.dirty=True
 
     def writeBytes(self, ba, value=None):
         """
@@ -443,11 +675,14 @@ class triHex(triRegister):
         extracts the value from the final bytes of the passed buffer
         """
         self.setVal(self.unpackBytes(ba))
+        self.dirty=False
 
 class triInt(triHex):
     """
     Registers that hold a single integer in the low order bits
     """
+    __slots__=()
+
     def setVal(self, value):
         """
         called when a new value read from the chip: updates the last known chip value
@@ -467,25 +702,31 @@ class triInt(triHex):
         self.packBytes(ba, self.getCurrent() & self.mask)
 
 class triPosint(triInt):
+    __slots__=('mask', 'maxval', 'minval')
+
     def __init__(self, sigbits, maxval=None, initialval=0, **kwargs):
         super().__init__(**kwargs)
-        self.maxval=2**sigbits-1 if maxval is None else maxval
-        self.minval=0
         self.mask=2**sigbits-1
+        self.maxval=self.mask if maxval is None else maxval
+        self.minval=0
         self.setVal(initialval)
 
     def loadBytes(self, ba):
         """
         extracts the value from the final bytes of the passed buffer
         """
-        self.setVal(self.unpackBytes(ba)) & self.mask
+        self.setVal(self.unpackBytes(ba) & self.mask)
+        self.dirty=False
 
 class triSignedint(triInt):
+    __slots__=('mask', 'maxval', 'minval', 'signbit')
+
     def __init__(self, sigbits, initialval=0, **kwargs):
         super().__init__(**kwargs)
-        self.maxval=2**(sigbits-1)-1
-        self.minval=-self.maxval-1
-        self.mask=2**sigbits-1
+        self.signbit=2**(sigbits-1)
+        self.maxval=self.signbit-1
+        self.minval=-self.signbit
+        self.mask=self.signbit*2-1
         self.setVal(initialval)
 
     def loadBytes(self, ba):
@@ -493,22 +734,23 @@ class triSignedint(triInt):
         extracts the value from the final bytes of the passed buffer
         """
         bbval=self.unpackBytes(ba) & self.mask
-        if bbval & -self.minval:
-            self.setVal(self.minval*2+bbval)
-        else:
-            self.setVal(bbval)
+        self.setVal((bbval ^ self.signbit) - self.signbit)  # branchless 2's complement sign extension
+        self.dirty=False
 
 class triByteFlags(treedict.Tree_dict):
     """
     a special version for the status byte returned on every spi transfer - makes it look like another register to the app
     """
+    __slots__=('flagClass', 'flagLUT', 'curval')
+
     def __init__(self, flagClass, **kwargs):
         self.flagClass=flagClass
-        self.curval=self.flagClass.NONE
+        self.flagLUT=tuple(flagClass(v) for v in range(256))    # every SPI frame returns a status byte, so decode via LUT
+        self.curval=self.flagLUT[0]
         super().__init__(**kwargs)
 
     def loadByte(self, abyte):
-        self.curval=self.flagClass(abyte)
+        self.curval=self.flagLUT[abyte]
 
     def testFlag(self, flagbits):
         """
@@ -520,12 +762,16 @@ class triEnum(triRegister):
     """
     for registers where each value has a distinct meaning, use an enum to make code easier to understand
     """
+    __slots__=('enumClass', 'enumLUT', 'curval')
+
     def __init__(self, enumClass, **kwargs):
         self.enumClass=enumClass
+        self.enumLUT={m.value: m for m in enumClass}    # member lookup without the Enum.__call__ machinery
         super().__init__(**kwargs)
 
     def loadBytes(self, ba):
-        self.curval=self.enumClass(self.unpackBytes(ba))
+        self.curval=self.enumLUT[self.unpackBytes(ba)]
+        self.dirty=False
 
     def writeBytes(self, ba, value=None):
         """
@@ -545,18 +791,29 @@ class triMixed(triRegister):
     children of this field that are checked dynamically. They need to be created separately after this
     has been created. (see triSubReg below).
     """
+    __slots__=('flagmask', 'invflagmask', 'flagClass', 'curval')
+
+    flagmasks={}    # all-flags mask per flagClass - several registers share a class, compute each once
+
     def __init__(self, name, flagClass=None, **kwargs):
         if flagClass is None:
             self.flagmask=None
         else:
-            fall = flagClass(0)
-            for f in flagClass:
-                fall |= f
-            self.flagmask=fall.value
+            try:
+                self.flagmask=self.flagmasks[flagClass]
+            except KeyError:
+                fall = flagClass(0)
+                for f in flagClass:
+                    fall |= f
+                self.flagmask=self.flagmasks[flagClass]=fall.value
+        self.invflagmask=None if self.flagmask is None else ~self.flagmask     # precomputed - setFlag/toggleFlag run per control tick
         self.flagClass=flagClass
         self.curval=0
         super().__init__(name=name, **kwargs)
 
+    def getCurrent(self):
+        return self.curval
+
     def testFlags(self, flagbits):
         """
         test for 1 or more bits set (all must be set to return True)
@@ -578,8 +835,9 @@ class triMixed(triRegister):
             flags |= flag
         elif flag in flags:
             flags ^= flag
-        zap=self.curval & ~self.flagmask
+        zap=self.curval & self.invflagmask
         self.curval = zap | flags.value
+        self.dirty=True
 
     def toggleFlag(self, flag):
         """
@@ -588,18 +846,24 @@ class triMixed(triRegister):
         assert not self.flagmask is None
         flags = self.flagClass(self.curval & self.flagmask)
         flags ^= flag
-        zap = self.curval & ~self.flagmask
+        zap = self.curval & self.invflagmask
         self.curval = zap | flags.value
+        self.dirty=True
 
     def loadBytes(self, ba):
         self.curval=self.unpackBytes(ba)
+        self.dirty=False
 
     def writeBytes(self, ba, value=None):
         """
         fills the given 5 byte buffer with the bytes to write to the chip.
+
+        value: a complete new value for the register (a plain int or a flagClass combination), or None
+               to write the currently cached value - typically built up via setFlag and the sub-field children.
         """
         if not value is None:
-            raise ValueError('register %s cannot accept new value in writeBytes' % self.name)
+            self.curval=int(value)
+            self.dirty=True
         self.packBytes(ba, self.curval)
 
 class triSubInt(treedict.Tree_dict):
@@ -609,10 +873,13 @@ class triSubInt(treedict.Tree_dict):
     Instances of this class must be created as children of a triMixed instance. The current value
     is always that held in the parent
     """
+    __slots__=('lowbit', 'bitmask', 'invbitmask')
+
     def __init__(self, lowbit, bitcount, **kwargs):
         bitmask=2**bitcount-1
         self.lowbit=lowbit
         self.bitmask=bitmask << lowbit
+        self.invbitmask=~self.bitmask
         super().__init__(**kwargs)
 
     def getCurrent(self):
@@ -621,8 +888,9 @@ class triSubInt(treedict.Tree_dict):
     def set(self, value):
         shv=value<<self.lowbit
         assert shv & self.bitmask==shv
-        pv=self.parent.curval & ~self.bitmask
+        pv=self.parent.curval & self.invbitmask
         self.parent.curval = pv | shv
+        self.parent.dirty=True
 
 class triSubEnum(treedict.Tree_dict):
     """
@@ -631,10 +899,13 @@ class triSubEnum(treedict.Tree_dict):
     The register field is effectively an int, but since each value has a unique meaning, this 
     allows meaninful names to be used.
     """
+    __slots__=('lowbit', 'bitmask', 'invbitmask', 'enumClass')
+
     def __init__(self, lowbit, bitcount, enumClass, **kwargs):
         bitmask=2**bitcount-1
         self.lowbit=lowbit
         self.bitmask=bitmask << lowbit
+        self.invbitmask=~self.bitmask
         self.enumClass=enumClass
         super().__init__(**kwargs)
 
@@ -644,5 +915,5 @@ class triSubEnum(treedict.Tree_dict):
     def set(self, value):
         shv=value.value<<self.lowbit
         assert shv & self.bitmask==shv
-        pv=self.parent.curval & ~self.bitmask
+        pv=self.parent.curval & self.invbitmask
         self.parent.curval = pv | shv
\ No newline at end of file
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Register flag and enum definitions shared by the Trinamic motion controller chips supported here
+(currently the tmc5130 and tmc5160 - the definitions below are identical in both datasheets).
+
+The per chip modules (tmc5130regs / tmc5160regs) import and re-export these classes so existing code
+keeps working unchanged; holding a single copy here stops the chip modules drifting apart.
+"""
+
+from enum import Enum, IntFlag
+
+class GSTATflags(IntFlag):
+    """
+    Flags in the GSTAT register
+    """
+    NONE        = 0
+    reset       = 1
+    drv_err     = 2
+    uv_cp       = 4
+
+class rampFlags(IntFlag):
+    """
+    the flag bits in the ramp status register
+    """
+    NONE                = 0
+    limit_left          = 1
+    limit_right         = 2
+    latch_left          = 4
+    latch_right         = 8
+    stop_left           = 0x0010
+    stop_right          = 0x0020
+    stalled             = 0x0040
+    pos_reached_event   = 0x0080
+    vmax_reached        = 0x0100
+    pos_reached         = 0x0200
+    speed_zero          = 0x0400
+    zero_transit_wait   = 0x0800
+    reversed_dir        = 0x1000
+    stall_guard_active  = 0x2000
+
+class RAMPmode(Enum):
+    POSITION        = 0
+    VELOCITY_FWD    = 1
+    VELOCITY_REV    = 2
+    VOLICITY_HOLD   = 3
+
+class SWMODEflags(IntFlag):
+    NONE            = 0
+    stop_l_enable   = 2**0
+    stop_r_enable   = 2**1
+    pol_stop_l      = 2**2
+    pol_stop_r      = 2**3
+    swap_lr         = 2**4
+    latch_l_active  = 2**5
+    latch_l_inactive= 2**6
+    latch_r_active  = 2**7
+    latch_r_inactive= 2**8
+    en_latch_encoder= 2**9
+    sg_stop         = 2**10
+    en_softstop     = 2**11
+
+class DRVSTATflags(IntFlag):
+    fsactive            = 2**15
+    stallGuard          = 2**24
+    ot                  = 2**25
+    otpw                = 2**26
+    s2ga                = 2**27
+    s2gb                = 2**28
+    ola                 = 2**29
+    olb                 = 2**30
+    stst                = 2**31